@@ -1,81 +1,294 @@
+import bisect
+import functools
 import random
+import re
+import sqlite3
 import streamlit as st
-import matplotlib.pyplot as plt
 import csv
 import os
 from datetime import datetime
-from collections import defaultdict
-import openpyxl
+import numpy as np
+import pandas as pd
+import io
 from io import BytesIO
-from fpdf import FPDF
 
 FILENAME = "expenses.csv"
+DB_FILENAME = "expenses.db"
+COLUMNS = ["date", "amount", "category", "note"]
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+CREATE TABLE IF NOT EXISTS expenses(
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_cat ON expenses(category);
+CREATE INDEX IF NOT EXISTS idx_date ON expenses(date);
+CREATE TABLE IF NOT EXISTS meta(
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_CSV_IMPORTED_SQL = ("INSERT OR IGNORE INTO meta(key, value) "
+                     "VALUES ('csv_imported', '1')")
+
+_INSERT_SQL = ("INSERT INTO expenses(date, amount, category, note) "
+               "VALUES (?, ?, ?, ?)")
+
+_SELECT_SQL = "SELECT rowid AS id, date, amount, category, note FROM expenses"
+
+
+def _migrate_legacy_csv(conn):
+    if not os.path.exists(FILENAME):
+        return
+    # Completion is recorded in meta, in the same transaction as the
+    # import: an empty table is a legitimate state (the user deleted
+    # every row), not a license to re-import.
+    if conn.execute("SELECT EXISTS(SELECT 1 FROM meta "
+                    "WHERE key = 'csv_imported')").fetchone()[0]:
+        return
+    if conn.execute("SELECT EXISTS(SELECT 1 FROM expenses)").fetchone()[0]:
+        # A database populated before the marker existed: record the
+        # import as done rather than duplicating its rows.
+        conn.execute(_CSV_IMPORTED_SQL)
+        return
+    # A 1 MiB binary buffer keeps the one-shot import to a handful of
+    # large reads instead of the default small-block loop.
+    with open(FILENAME, mode='rb', buffering=1 << 20) as file:
+        text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(_INSERT_SQL, csv.reader(text))
+            conn.execute(_CSV_IMPORTED_SQL)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _connect():
+    conn = sqlite3.connect(DB_FILENAME, isolation_level=None,
+                           check_same_thread=False)
+    conn.executescript(_SCHEMA)
+    _migrate_legacy_csv(conn)
+    return conn
+
+
+conn = _connect()
+
+
+_AMOUNT_RE = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)")
+
+
+@functools.lru_cache(maxsize=256)
+def is_valid_amount(amount):
+    # A fullmatch avoids raising/catching ValueError per keystroke, and
+    # the small LRU skips re-validating repeated input values.
+    return _AMOUNT_RE.fullmatch(amount.strip()) is not None
 
 
-def is_valid_amount(amount):
+def _data_version():
+    # Kept in the sqlite header so every session and process sees the
+    # same counter; a session-local version would let one session's
+    # st.cache_data entries serve another session stale results.
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _bump_data_version():
+    # BEGIN IMMEDIATE takes the write lock before the read, so two
+    # concurrent bumps serialize instead of both writing N + 1 and
+    # sharing one version key for two different data states.
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        float(amount)
-        return True
-    except ValueError:
-        return False
+        version = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+        conn.execute(f"PRAGMA user_version = {version:d}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return version
 
 
-def read_expenses():
-    if not os.path.exists(FILENAME):
-        return []
-    with open(FILENAME, mode='r') as file:
-        return list(csv.reader(file))
+def _retag_cache(expenses):
+    # The frame was updated in place to mirror the table, so keep it and
+    # move it to the new version; version-keyed consumers (exports)
+    # recompute while reads skip a full re-select.
+    st.session_state["_expenses_cache"] = (_bump_data_version(), expenses)
 
 
-def write_expenses(expenses):
-    with open(FILENAME, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerows(expenses)
+def read_expenses():
+    # WAL writes land in the -wal sidecar, so the main file's mtime no
+    # longer tracks changes; key the cache on the data version that
+    # every mutation bumps instead.
+    version = _data_version()
+    cached = st.session_state.get("_expenses_cache")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    expenses = pd.read_sql_query(_SELECT_SQL, conn)
+    expenses["date"] = pd.to_datetime(expenses["date"], format=DATE_FORMAT)
+    # Dictionary-encode categories once: small integer codes instead of a
+    # Python string per row, which every groupby and compare benefits from.
+    expenses["category"] = expenses["category"].astype("category")
+    st.session_state["_expenses_cache"] = (version, expenses)
+    return expenses
+
+
+def _ensure_category(expenses, category):
+    cats = expenses["category"]
+    # Re-assert the dtype rather than assume it: a prior row assignment
+    # may have upcast the column to object.
+    if cats.dtype != "category":
+        cats = cats.astype("category")
+    if category not in cats.cat.categories:
+        cats = cats.cat.add_categories([category])
+    expenses["category"] = cats
+
+
+def add_expense(date, amount, category, note):
+    cur = conn.execute(_INSERT_SQL, (date, amount, category, note))
+    cached = st.session_state.get("_expenses_cache")
+    if cached is None:
+        _bump_data_version()
+        return
+    _, expenses = cached
+    _ensure_category(expenses, category)
+    expenses.loc[len(expenses)] = [
+        cur.lastrowid, pd.Timestamp(date), float(amount), category, note]
+    # Enlarging through .loc upcasts the Categorical column to object;
+    # re-encode so .cat consumers keep working.
+    expenses["category"] = expenses["category"].astype("category")
+    _retag_cache(expenses)
+
+
+def update_expense(expense_id, date, amount, category, note):
+    conn.execute(
+        "UPDATE expenses SET date = ?, amount = ?, category = ?, note = ? "
+        "WHERE rowid = ?",
+        (date, amount, category, note, expense_id))
+    cached = st.session_state.get("_expenses_cache")
+    if cached is None:
+        _bump_data_version()
+        return
+    _, expenses = cached
+    _ensure_category(expenses, category)
+    expenses.loc[expenses["id"] == expense_id, COLUMNS] = [
+        pd.Timestamp(date), amount, category, note]
+    if expenses["category"].dtype != "category":
+        expenses["category"] = expenses["category"].astype("category")
+    _retag_cache(expenses)
+
+
+def delete_expense(expense_id):
+    conn.execute("DELETE FROM expenses WHERE rowid = ?", (expense_id,))
+    cached = st.session_state.get("_expenses_cache")
+    if cached is None:
+        _bump_data_version()
+        return
+    _, expenses = cached
+    expenses.drop(expenses.index[expenses["id"] == expense_id], inplace=True)
+    expenses.reset_index(drop=True, inplace=True)
+    _retag_cache(expenses)
 
 
 def generate_excel(expenses):
+    # Deferred so cold start doesn't pay for the export library unless a
+    # download is actually requested; sys.modules makes repeats free.
+    import openpyxl
+
     output = BytesIO()
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Expenses"
+    # Write-only mode streams each row out instead of holding a Cell
+    # object per cell, keeping peak memory flat for large exports.
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Expenses")
     ws.append(["Date", "Amount", "Category", "Note"])
-    for row in expenses:
-        ws.append(row)
+    for row in expenses.itertuples(index=False):
+        ws.append([row.date.strftime(DATE_FORMAT),
+                   row.amount, row.category, row.note])
     wb.save(output)
     output.seek(0)
     return output
 
 
 def generate_pdf(expenses):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Expense Report", ln=True, align='C')
-    pdf.ln(10)
-
-    for row in expenses:
-        line = f"Date: {row[0]}, Amount: R{row[1]}, Category: {row[2]}, Note: {row[3]}"
-        pdf.multi_cell(0, 10, line)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
 
     output = BytesIO()
-    pdf_output = pdf.output(dest='S').encode('latin-1')
-    output.write(pdf_output)
+    # reportlab serializes each page on showPage, so only the current
+    # page's draw ops are held in memory, not the whole document.
+    pdf = canvas.Canvas(output, pagesize=A4)
+    width, height = A4
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawCentredString(width / 2, height - 40, "Expense Report")
+    pdf.setFont("Helvetica", 10)
+    y = height - 64
+
+    for row in expenses.itertuples(index=False):
+        line = (f"Date: {row.date:%Y-%m-%d %H:%M}, Amount: R{row.amount}, "
+                f"Category: {row.category}, Note: {row.note}")
+        pdf.drawString(40, y, line)
+        y -= 14
+        if y < 40:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 10)
+            y = height - 40
+
+    pdf.save()
     output.seek(0)
     return output
 
 
+@st.cache_data(show_spinner=False)
+def excel_export(version):
+    # version is the cache key: rebuilding only happens after a mutation
+    # bumps it, not on every rerun that lands on a download button.
+    return generate_excel(read_expenses()).getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def pdf_export(version):
+    return generate_pdf(read_expenses()).getvalue()
+
+
+def category_totals(expenses):
+    # Struct-of-arrays accumulation: integer category codes plus a
+    # contiguous amounts buffer, summed in a single C-level pass.
+    # Drop dictionary entries whose last row was edited or deleted away,
+    # so emptied categories vanish like they do on a fresh read.
+    cats = expenses["category"].cat.remove_unused_categories()
+    totals = np.bincount(cats.cat.codes.to_numpy(),
+                         weights=expenses["amount"].to_numpy(),
+                         minlength=len(cats.cat.categories))
+    return cats.cat.categories, totals
+
+
+@st.cache_data(show_spinner=False)
+def aggregates(version):
+    # One pass yields both the per-category sums and the grand total, and
+    # the version key means it runs at most once per data version however
+    # many menu branches consume it.
+    labels, totals = category_totals(read_expenses())
+    return labels, totals, float(totals.sum())
+
+
+_FEEDBACK_TIERS = (1000, 5000, 10000)
+_FEEDBACK_MSGS = (
+    "You're doing great! Keep up the low spending habits.",
+    "You're managing fairly well, but review any non-essentials.",
+    "Consider budgeting more strictly and cutting excesses.",
+    "Warning: High spending! Analyze where most of your money is going."
+)
+
+
 def financial_feedback(total, budget=None):
     if total == 0:
         return "No expenses recorded. Start tracking to understand your habits."
-    feedback = ""
-    if total < 1000:
-        feedback += "You're doing great! Keep up the low spending habits."
-    elif total < 5000:
-        feedback += "You're managing fairly well, but review any non-essentials."
-    elif total < 10000:
-        feedback += "Consider budgeting more strictly and cutting excesses."
-    else:
-        feedback += "Warning: High spending! Analyze where most of your money is going."
+    feedback = _FEEDBACK_MSGS[bisect.bisect_right(_FEEDBACK_TIERS, total)]
 
     if budget:
         if total > budget:
@@ -85,30 +298,44 @@ def financial_feedback(total, budget=None):
     return feedback
 
 
+_RANDOM_TIPS = (
+    "Track your spending daily to avoid surprises.",
+    "Group similar expenses to understand patterns.",
+    "Always categorize your income separately.",
+    "Try to save at least 10% of your monthly income.",
+    "Review your top 3 expense categories weekly.",
+    "Use the summary graph to find spending leaks.",
+    "Avoid emotional spending — pause before buying."
+)
+
+_EXPENSE_TIPS = (
+    "Have you considered using separate categories for fixed vs variable expenses?",
+    "Look at your most frequent category — is there a way to reduce it?",
+    "Use spending caps per category to better control your budget.",
+    "Consider using cash for categories where you overspend digitally.",
+    "High spending in one area? Try a weekly spending freeze for it."
+)
+
+
 def show_random_tip():
-    tips = [
-        "Track your spending daily to avoid surprises.",
-        "Group similar expenses to understand patterns.",
-        "Always categorize your income separately.",
-        "Try to save at least 10% of your monthly income.",
-        "Review your top 3 expense categories weekly.",
-        "Use the summary graph to find spending leaks.",
-        "Avoid emotional spending — pause before buying."
-    ]
-    return random.choice(tips)
+    return random.choice(_RANDOM_TIPS)
 
 
 def tip_based_on_expenses(expenses):
-    if not expenses:
+    if len(expenses) == 0:
         return "Start logging your expenses to get personalized tips!"
-    tips = [
-        "Have you considered using separate categories for fixed vs variable expenses?",
-        "Look at your most frequent category — is there a way to reduce it?",
-        "Use spending caps per category to better control your budget.",
-        "Consider using cash for categories where you overspend digitally.",
-        "High spending in one area? Try a weekly spending freeze for it."
-    ]
-    return random.choice(tips)
+    return random.choice(_EXPENSE_TIPS)
+
+
+PAGE_SIZE = 50
+
+
+def show_expense_page(expenses):
+    # One Arrow-backed dataframe per page instead of a Streamlit element
+    # per row, so rerun cost stays O(page size) however many rows exist.
+    last_page = (len(expenses) - 1) // PAGE_SIZE
+    page = st.number_input("Page", min_value=0, max_value=last_page, step=1)
+    st.dataframe(expenses.iloc[page * PAGE_SIZE:(page + 1) * PAGE_SIZE])
 
 
 def main():
@@ -140,32 +367,28 @@ def main():
         category = st.text_input("Category")
         note = st.text_input("Note")
         if st.button("Add Expense"):
-            date = datetime.now().strftime("%Y-%m-%d %H:%M")
-            with open(FILENAME, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([date, amount, category, note])
+            date = datetime.now().strftime(DATE_FORMAT)
+            add_expense(date, amount, category, note)
             st.success("Expense added!")
 
     elif choice == "View Expenses":
         expenses = read_expenses()
-        if expenses:
+        if not expenses.empty:
             st.subheader("Expense Records")
             st.table(expenses)
+            version = _data_version()
             col1, col2 = st.columns(2)
             with col1:
-                excel_data = generate_excel(expenses)
-                st.download_button("Download as Excel",
-                                   excel_data, file_name="expenses.xlsx")
+                st.download_button("Download as Excel", excel_export(version),
+                                   file_name="expenses.xlsx")
             with col2:
-                pdf_data = generate_pdf(expenses)
-                st.download_button("Download as PDF", pdf_data,
+                st.download_button("Download as PDF", pdf_export(version),
                                    file_name="expenses.pdf")
         else:
             st.info("No expenses recorded yet.")
 
     elif choice == "View Total":
-        expenses = read_expenses()
-        total = sum(float(row[1]) for row in expenses)
+        total = aggregates(_data_version())[2]
         st.metric("Total Expenses", f"R{total:.2f}")
 
         if st.session_state.salary:
@@ -185,34 +408,35 @@ def main():
 
     elif choice == "Delete Expense":
         expenses = read_expenses()
-        if expenses:
-            for i, row in enumerate(expenses):
-                st.write(f"{i}: {row}")
+        if not expenses.empty:
+            show_expense_page(expenses)
             idx = st.number_input(
                 "Enter ID to delete", min_value=0, max_value=len(expenses)-1, step=1)
             if st.button("Delete"):
-                removed = expenses.pop(idx)
-                write_expenses(expenses)
-                st.success(f"Deleted: {removed}")
+                removed = expenses.iloc[idx]
+                delete_expense(int(removed["id"]))
+                st.success(
+                    f"Deleted: {removed['date'].strftime(DATE_FORMAT)}, "
+                    f"R{removed['amount']:.2f}, {removed['category']}, "
+                    f"{removed['note']}")
         else:
             st.info("No expenses to delete.")
 
     elif choice == "Edit Expense":
         expenses = read_expenses()
-        if expenses:
-            for i, row in enumerate(expenses):
-                st.write(f"{i}: {row}")
+        if not expenses.empty:
+            show_expense_page(expenses)
             idx = st.number_input(
                 "Enter ID to edit", min_value=0, max_value=len(expenses)-1, step=1)
-            date, amount, category, note = expenses[idx]
+            date, amount, category, note = expenses.iloc[idx][COLUMNS]
             new_amount = st.text_input("Amount (R)", value=str(amount))
             new_category = st.text_input("Category", value=category)
             new_note = st.text_input("Note", value=note)
             if st.button("Save Changes"):
                 if is_valid_amount(new_amount):
-                    expenses[idx] = [date, float(
-                        new_amount), new_category, new_note]
-                    write_expenses(expenses)
+                    update_expense(int(expenses.iloc[idx]["id"]),
+                                   date.strftime(DATE_FORMAT),
+                                   float(new_amount), new_category, new_note)
                     st.success("Expense updated.")
                 else:
                     st.error("Invalid amount entered.")
@@ -220,52 +444,53 @@ def main():
             st.info("No expenses to edit.")
 
     elif choice == "Filter Expenses":
-        expenses = read_expenses()
         filter_type = st.radio("Filter by", ("Category", "Date"))
+        # Filtering in the engine means only matching rows ever reach
+        # Python, so memory stays bounded however large the table grows.
         if filter_type == "Category":
             category = st.text_input("Enter category to filter")
-            filtered = [e for e in expenses if e[2].lower() ==
-                        category.lower()]
+            filtered = pd.read_sql_query(
+                _SELECT_SQL + " WHERE category = ? COLLATE NOCASE",
+                conn, params=(category,))
         else:
             date = st.text_input("Enter date (YYYY-MM-DD)")
-            filtered = [e for e in expenses if e[0].startswith(date)]
+            # Timestamps sort lexicographically, so a prefix match is the
+            # half-open range [prefix, prefix + U+FFFF) — a straight
+            # index range scan with no per-row pattern matching.
+            filtered = pd.read_sql_query(
+                _SELECT_SQL + " WHERE date >= ? AND date < ?",
+                conn, params=(date, date + "\uffff"))
         st.table(filtered)
 
     elif choice == "Sort Expenses":
         expenses = read_expenses()
         sort_by = st.radio("Sort by", ("Date", "Amount"))
         if sort_by == "Date":
-            expenses.sort(key=lambda x: datetime.strptime(
-                x[0], "%Y-%m-%d %H:%M"))
+            expenses = expenses.sort_values("date", kind="mergesort")
         else:
-            expenses.sort(key=lambda x: float(x[1]))
+            expenses = expenses.sort_values("amount")
         st.table(expenses)
 
     elif choice == "Summary by Category":
-        expenses = read_expenses()
-        summary = defaultdict(float)
-        for row in expenses:
-            summary[row[2]] += float(row[1])
-        for category, total in summary.items():
+        labels, totals, _ = aggregates(_data_version())
+        for category, total in zip(labels, totals):
             st.write(f"{category}: R{total:.2f}")
 
     elif choice == "Export to Excel":
         expenses = read_expenses()
-        if expenses:
-            excel_data = generate_excel(expenses)
-            st.download_button("Download as Excel",
-                               excel_data, file_name="expenses.xlsx")
+        if not expenses.empty:
+            version = _data_version()
+            st.download_button("Download as Excel", excel_export(version),
+                               file_name="expenses.xlsx")
         else:
             st.info("No expenses to export.")
 
     elif choice == "Visualize Category Breakdown":
+        import matplotlib.pyplot as plt
+
         expenses = read_expenses()
-        if expenses:
-            category_totals = defaultdict(float)
-            for row in expenses:
-                category_totals[row[2]] += float(row[1])
-            labels = list(category_totals.keys())
-            sizes = list(category_totals.values())
+        if not expenses.empty:
+            labels, sizes, _ = aggregates(_data_version())
             fig, ax = plt.subplots()
             ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
             ax.axis('equal')
@@ -275,22 +500,22 @@ def main():
 
     elif choice == "Financial Management Report":
         expenses = read_expenses()
-        if expenses:
+        if not expenses.empty:
             time_range = st.radio(
                 "Evaluate for", ["This Month", "This Year", "All Time"])
             budget = st.number_input(
                 "Enter your budget (R)", min_value=0.0, format="%.2f")
             now = datetime.now()
             if time_range == "This Month":
-                filtered = [e for e in expenses if datetime.strptime(
-                    e[0], "%Y-%m-%d %H:%M").month == now.month and datetime.strptime(e[0], "%Y-%m-%d %H:%M").year == now.year]
+                dates = expenses["date"].dt
+                filtered = expenses[(dates.month == now.month) &
+                                    (dates.year == now.year)]
             elif time_range == "This Year":
-                filtered = [e for e in expenses if datetime.strptime(
-                    e[0], "%Y-%m-%d %H:%M").year == now.year]
+                filtered = expenses[expenses["date"].dt.year == now.year]
             else:
                 filtered = expenses
 
-            total = sum(float(row[1]) for row in filtered)
+            total = float(filtered["amount"].sum())
             feedback = financial_feedback(total, budget=budget)
             st.subheader("Financial Report")
             st.write(f"**Total Spending ({time_range})**: R{total:.2f}")